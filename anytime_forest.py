@@ -0,0 +1,186 @@
+"""
+Anytime Random Forest prediction with early exit
+Evaluates the trees of a fitted RF pipeline in blocks and stops as soon as the
+decision relative to the 0.5 threshold used by /predict cannot flip
+
+Trees are visited in a fixed random order, so after k of T trees the running
+mean of the per-tree probabilities is a sample (without replacement) of the
+full-forest probability. A row stops when either
+- the remaining trees cannot move the mean across 0.5 (exact), or
+- the Hoeffding-Serfling bound
+      eps = sqrt((1 - (k - 1) / T) * ln(2 / delta') / (2k))
+  puts the full-forest mean on one side of 0.5, with delta' = delta / number
+  of checks, so the chance of disagreeing with the full forest is at most delta.
+
+Usage:
+    python anytime_forest.py --rows 20000 --delta 0.01 --block-size 16
+"""
+import sys
+import math
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+SEED = 42
+DEFAULT_MODEL_PATH = Path("models/best_randomforest_pipeline.joblib")
+
+
+def _split_pipeline(pipeline):
+    """Return (preprocessing steps or None, RandomForestClassifier)"""
+    if hasattr(pipeline, 'steps'):
+        prep = pipeline[:-1] if len(pipeline.steps) > 1 else None
+        return prep, pipeline.steps[-1][1]
+    return None, pipeline
+
+
+def _tree_input(X):
+    """Convert once to the float32 layout the trees expect, so each tree can skip validation"""
+    if sp.issparse(X):
+        X = sp.csr_matrix(X, dtype=np.float32)
+        X.sort_indices()
+        return X
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def anytime_predict_proba(pipeline, X, delta=0.01, block_size=16, min_trees=None,
+                          max_trees=None, budget_ms=None, seed=SEED):
+    """
+    Early-exit positive-class probability for each row of X
+
+    Parameters
+    - delta: allowed probability that a row's decision differs from the full forest
+    - block_size: trees evaluated between stopping checks
+    - min_trees: trees always evaluated before the first check (default: block_size)
+    - max_trees: hard cap on trees per row (latency knob; the bound no longer holds when hit)
+    - budget_ms: stop at the next block boundary once this much time has elapsed
+
+    Returns a dict of arrays: probability, prediction, trees_evaluated, early_exit,
+    plus n_trees (forest size).
+    """
+    prep, forest = _split_pipeline(pipeline)
+    estimators = forest.estimators_
+    n_trees = len(estimators)
+    pos = list(forest.classes_).index(1)
+
+    start = time.perf_counter()
+    Xt = prep.transform(X) if prep is not None else X
+    Xt = _tree_input(Xt)
+    n_rows = Xt.shape[0]
+
+    order = np.random.default_rng(seed).permutation(n_trees)
+    block_size = max(1, int(block_size))
+    min_trees = block_size if min_trees is None else max(1, int(min_trees))
+    limit = n_trees if max_trees is None else max(1, min(int(max_trees), n_trees))
+    n_checks = max(1, math.ceil((limit - min_trees) / block_size) + 1)
+    log_term = math.log(2 * n_checks / delta)
+
+    sums = np.zeros(n_rows)
+    counts = np.zeros(n_rows, dtype=int)
+    early = np.zeros(n_rows, dtype=bool)
+    active = np.arange(n_rows)
+
+    k = 0
+    while k < limit and len(active):
+        step = min_trees if k == 0 else block_size
+        block = order[k:min(k + step, limit)]
+        X_active = Xt[active]
+        for idx in block:
+            sums[active] += estimators[idx].predict_proba(X_active, check_input=False)[:, pos]
+        k += len(block)
+        counts[active] = k
+
+        if k >= n_trees:
+            break
+        mean = sums[active] / k
+        # Exact: even if every remaining tree voted 1 (or 0) the side of 0.5 cannot change
+        certain = ((sums[active] + (n_trees - k)) <= 0.5 * n_trees) | (sums[active] > 0.5 * n_trees)
+        eps = math.sqrt((1 - (k - 1) / n_trees) * log_term / (2 * k))
+        bounded = (mean - eps > 0.5) | (mean + eps < 0.5)
+        stop = certain | bounded
+        early[active[stop]] = True
+        active = active[~stop]
+
+        if budget_ms is not None and (time.perf_counter() - start) * 1000 >= budget_ms:
+            break
+
+    probability = sums / np.maximum(counts, 1)
+    return {
+        'probability': probability,
+        # Same tie-breaking as RandomForestClassifier.predict (argmax favours class 0)
+        'prediction': (probability > 0.5).astype(int),
+        'trees_evaluated': counts,
+        'early_exit': early,
+        'n_trees': n_trees,
+    }
+
+
+def evaluate(pipeline, X, delta=0.01, block_size=16, latency_rows=500, seed=SEED):
+    """Disagreement rate, trees used and speedup of anytime vs full-forest prediction"""
+    full_proba = pipeline.predict_proba(X)[:, list(pipeline.classes_).index(1)]
+    full_pred = pipeline.predict(X)
+    result = anytime_predict_proba(pipeline, X, delta=delta, block_size=block_size, seed=seed)
+
+    # Single-row latency is what /predict pays
+    rows = [X.iloc[[i]] for i in range(min(latency_rows, len(X)))]
+    t0 = time.perf_counter()
+    for row in rows:
+        pipeline.predict_proba(row)
+    full_ms = (time.perf_counter() - t0) * 1000 / len(rows)
+    t0 = time.perf_counter()
+    for row in rows:
+        anytime_predict_proba(pipeline, row, delta=delta, block_size=block_size, seed=seed)
+    anytime_ms = (time.perf_counter() - t0) * 1000 / len(rows)
+
+    return {
+        'rows': len(X),
+        'n_trees': result['n_trees'],
+        'delta': delta,
+        'block_size': block_size,
+        'disagreement_rate': float(np.mean(result['prediction'] != full_pred)),
+        'mean_abs_probability_error': float(np.mean(np.abs(result['probability'] - full_proba))),
+        'mean_trees_evaluated': float(result['trees_evaluated'].mean()),
+        'early_exit_rate': float(result['early_exit'].mean()),
+        'full_latency_ms': round(full_ms, 3),
+        'anytime_latency_ms': round(anytime_ms, 3),
+        'speedup': round(full_ms / anytime_ms, 2) if anytime_ms > 0 else None,
+    }
+
+
+def main():
+    from joblib import load
+    from generate_synthetic_data import DATA_FILE, NUMERIC_COLS, CATEGORICAL_COLS, generate_frame
+
+    parser = argparse.ArgumentParser(description="Evaluate anytime RF prediction against the full forest")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH), help="RF pipeline (.joblib)")
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic rows to evaluate")
+    parser.add_argument("--delta", type=float, nargs="+", default=[0.01], help="Allowed disagreement probability")
+    parser.add_argument("--block-size", type=int, default=16, help="Trees per block")
+    parser.add_argument("--latency-rows", type=int, default=500, help="Rows timed one at a time")
+    parser.add_argument("--data-file", default=str(DATA_FILE), help="Path to processed.cleveland.data")
+    args = parser.parse_args()
+
+    pipeline = load(args.model)
+    df = generate_frame(args.rows, seed=SEED + 1, data_file=args.data_file)
+    X = df[NUMERIC_COLS + CATEGORICAL_COLS]
+
+    print("=" * 60)
+    print("Anytime Random Forest Evaluation")
+    print("=" * 60)
+    for delta in args.delta:
+        report = evaluate(pipeline, X, delta, args.block_size, args.latency_rows)
+        print(f"\ndelta={delta} block_size={args.block_size} (forest: {report['n_trees']} trees)")
+        print(f"  Disagreement vs full forest: {report['disagreement_rate']:.4%}")
+        print(f"  Mean |probability error|:    {report['mean_abs_probability_error']:.4f}")
+        print(f"  Mean trees evaluated:        {report['mean_trees_evaluated']:.1f}")
+        print(f"  Single-row latency:          {report['full_latency_ms']:.2f} ms -> "
+              f"{report['anytime_latency_ms']:.2f} ms ({report['speedup']}x)")
+
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    main()
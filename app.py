@@ -2,16 +2,23 @@
 FastAPI application for Heart Disease Prediction Model
 Deployed on Azure App Service
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
+import asyncio
+import threading
 import numpy as np
 import pandas as pd
 from joblib import load
 import os
 from pathlib import Path
 
+import profiling
+import score_store
+import anytime_forest
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Heart Disease Prediction API",
@@ -68,14 +75,32 @@ class PredictionResponse(BaseModel):
     probability: float = Field(..., description="Probability of disease")
     model_used: str = Field(..., description="Model used for prediction")
 
+class AnytimePredictionResponse(PredictionResponse):
+    trees_evaluated: int = Field(..., description="Trees that voted before the early exit")
+    n_trees: int = Field(..., description="Trees in the forest")
+    early_exit: bool = Field(..., description="True if the decision was settled before all trees voted")
+
+class ScoreResponse(PredictionResponse):
+    patient_id: str = Field(..., description="Patient identifier")
+    model_version: str = Field(..., description="Version of the model that produced the score")
+
 # Global model variables
 model_lr = None
 model_rf = None
+model_student = None
+model_lr_path = None
+model_rf_path = None
+model_student_path = None
 MODEL_TYPE = os.getenv("MODEL_TYPE", "logreg")  # Default to logistic regression
 
+# Precomputed score store (see score_store.py)
+score_store_db = None
+SCORE_STORE_PATH = Path(os.getenv("SCORE_STORE_PATH", str(score_store.DEFAULT_STORE_PATH)))
+SCORE_POPULATION_FILE = os.getenv("SCORE_POPULATION_FILE")  # Rebuild source when the model changes
+
 def load_model():
     """Load the trained model"""
-    global model_lr, model_rf
+    global model_lr, model_rf, model_student, model_lr_path, model_rf_path, model_student_path
     
     # Try to load from different possible paths
     model_paths = [
@@ -83,6 +108,7 @@ def load_model():
         Path("models/logreg_cv_best_pipeline.joblib"),
         Path("models/best_randomforest_pipeline.joblib"),
         Path("models/rf_cv_best_pipeline.joblib"),
+        Path("models/distilled_student_pipeline.joblib"),
     ]
     
     # Also check Azure App Service default paths
@@ -94,24 +120,113 @@ def load_model():
             base_path / "models/logreg_cv_best_pipeline.joblib",
             base_path / "models/best_randomforest_pipeline.joblib",
             base_path / "models/rf_cv_best_pipeline.joblib",
+            base_path / "models/distilled_student_pipeline.joblib",
         ])
     
     # Load models
     for path in model_paths:
         if path.exists():
             try:
-                if "logreg" in path.name.lower():
+                if "distilled" in path.name.lower():
+                    model_student = load(path)
+                    model_student_path = path
+                    print(f"Loaded distilled student model from {path}")
+                elif "logreg" in path.name.lower():
                     model_lr = load(path)
+                    model_lr_path = path
                     print(f"Loaded Logistic Regression model from {path}")
                 elif "randomforest" in path.name.lower() or "rf" in path.name.lower():
                     model_rf = load(path)
+                    model_rf_path = path
                     print(f"Loaded Random Forest model from {path}")
             except Exception as e:
                 print(f"Error loading {path}: {e}")
     
-    if model_lr is None and model_rf is None:
+    if model_lr is None and model_rf is None and model_student is None:
         raise FileNotFoundError("No model files found. Please ensure model files are in the models/ directory.")
 
+def select_model():
+    """Pick the model to serve based on MODEL_TYPE and availability; returns (model, model_name)"""
+    if MODEL_TYPE.lower() in ["logreg", "logistic", "lr"]:
+        if model_lr is not None:
+            return model_lr, "logistic_regression"
+        if model_rf is not None:
+            return model_rf, "random_forest"
+    elif MODEL_TYPE.lower() in ["distilled", "student"]:
+        if model_student is not None:
+            return model_student, "distilled_student"
+        if model_rf is not None:
+            return model_rf, "random_forest"
+        if model_lr is not None:
+            return model_lr, "logistic_regression"
+    else:
+        if model_rf is not None:
+            return model_rf, "random_forest"
+        if model_lr is not None:
+            return model_lr, "logistic_regression"
+    if model_student is not None:
+        return model_student, "distilled_student"
+    return None, ""
+
+def current_model_version():
+    """Content hash of the model file select_model() serves, or None if no model is loaded"""
+    model, model_name = select_model()
+    if model is None:
+        return None
+    path = {
+        "logistic_regression": model_lr_path,
+        "random_forest": model_rf_path,
+        "distilled_student": model_student_path,
+    }[model_name]
+    return f"{model_name}-{score_store.model_version(path)}"
+
+def rebuild_score_store(version):
+    """
+    Re-score SCORE_POPULATION_FILE with the current model and swap the new store in
+
+    Only the worker holding the build lock re-scores; the others wait for it
+    and reopen the result, or take the rebuild over if its builder died.
+    """
+    global score_store_db
+    while not score_store.acquire_build_lock(SCORE_STORE_PATH):
+        print("Another worker is rebuilding the score store; waiting for it...")
+        store = score_store.wait_for_store(SCORE_STORE_PATH, version)
+        if store is not None:
+            score_store_db = store
+            print(f"Score store loaded: {store.count} patients (model {version})")
+            return
+        if score_store.build_lock_held(SCORE_STORE_PATH):
+            print("Score store rebuild did not finish; /scores stays unavailable")
+            return
+        # The builder died or failed without a store; try to take over the rebuild
+    try:
+        # A worker that finished just before we took the lock may already have built it
+        store = score_store.open_store(SCORE_STORE_PATH, version)
+        if store is None:
+            model, model_name = select_model()
+            score_store.build_store(model, model_name, version, SCORE_POPULATION_FILE, SCORE_STORE_PATH)
+            store = score_store.open_store(SCORE_STORE_PATH, version)
+            print(f"Score store rebuilt for model {version}: {store.count} patients")
+        score_store_db = store
+    except Exception as e:
+        print(f"Error rebuilding score store: {e}")
+    finally:
+        score_store.release_build_lock(SCORE_STORE_PATH)
+
+def refresh_score_store():
+    """Open the score store if it matches the current model, otherwise invalidate (and rebuild)"""
+    global score_store_db
+    version = current_model_version()
+    score_store_db = None
+    if version is None:
+        return
+    score_store_db = score_store.open_store(SCORE_STORE_PATH, version)
+    if score_store_db is not None:
+        print(f"Score store loaded: {score_store_db.count} patients (model {version})")
+    elif SCORE_POPULATION_FILE:
+        print(f"Rebuilding score store from {SCORE_POPULATION_FILE} in the background...")
+        threading.Thread(target=rebuild_score_store, args=(version,), daemon=True).start()
+
 @app.on_event("startup")
 async def startup_event():
     """Load model on startup"""
@@ -121,6 +236,10 @@ async def startup_event():
     except Exception as e:
         print(f"Error loading models: {e}")
         print("API will start but predictions will fail until models are available.")
+    try:
+        refresh_score_store()
+    except Exception as e:
+        print(f"Error loading score store: {e}")
 
 @app.get("/")
 async def root():
@@ -128,7 +247,7 @@ async def root():
     return {
         "message": "Heart Disease Prediction API",
         "status": "running",
-        "model_loaded": model_lr is not None or model_rf is not None,
+        "model_loaded": model_lr is not None or model_rf is not None or model_student is not None,
         "model_type": MODEL_TYPE
     }
 
@@ -137,9 +256,43 @@ async def health():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "model_loaded": model_lr is not None or model_rf is not None
+        "model_loaded": model_lr is not None or model_rf is not None or model_student is not None
     }
 
+NUMERIC_COLS = ['age','trestbps','chol','thalach','oldpeak','ca']
+CATEGORICAL_COLS = ['sex','cp','fbs','restecg','exang','slope','thal']
+
+def _input_row(input_data):
+    """One input as a list of values in NUMERIC_COLS + CATEGORICAL_COLS order"""
+    return [
+        float(input_data.age),
+        float(input_data.trestbps),
+        float(input_data.chol),
+        float(input_data.thalach),
+        float(input_data.oldpeak),
+        float(input_data.ca),
+        int(input_data.sex),
+        int(input_data.cp),
+        int(input_data.fbs),
+        int(input_data.restecg),
+        int(input_data.exang),
+        int(input_data.slope),
+        int(input_data.thal)
+    ]
+
+def inputs_to_frame(inputs):
+    """Convert inputs to one DataFrame with the training column order and dtypes"""
+    features = pd.DataFrame([_input_row(x) for x in inputs], columns=NUMERIC_COLS + CATEGORICAL_COLS)
+    
+    # Ensure correct dtypes (match training exactly)
+    for c in NUMERIC_COLS + CATEGORICAL_COLS:
+        features[c] = pd.to_numeric(features[c], errors='coerce')
+    return features
+
+def input_to_frame(input_data):
+    """Convert one input to a single-row DataFrame with the training column order and dtypes"""
+    return inputs_to_frame([input_data])
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(input_data: HeartDiseaseInput):
     """
@@ -150,60 +303,23 @@ async def predict(input_data: HeartDiseaseInput):
     - probability: Probability of disease (0-1)
     - model_used: Which model was used for prediction
     """
+    # None unless an /admin/profile session is active
+    timer = profiling.begin_request("/predict")
     try:
-        # Convert input to pandas DataFrame in the correct order
-        # Match exact format from training
-        NUMERIC_COLS = ['age','trestbps','chol','thalach','oldpeak','ca']
-        CATEGORICAL_COLS = ['sex','cp','fbs','restecg','exang','slope','thal']
-        feature_names = NUMERIC_COLS + CATEGORICAL_COLS
-        
-        # Create DataFrame exactly as in training (list of lists with columns)
-        features = pd.DataFrame([[
-            float(input_data.age),
-            int(input_data.sex),
-            int(input_data.cp),
-            float(input_data.trestbps),
-            float(input_data.chol),
-            int(input_data.fbs),
-            int(input_data.restecg),
-            float(input_data.thalach),
-            int(input_data.exang),
-            float(input_data.oldpeak),
-            int(input_data.slope),
-            float(input_data.ca),
-            int(input_data.thal)
-        ]], columns=feature_names)
-        
-        # Ensure correct dtypes (match training exactly)
-        for c in NUMERIC_COLS:
-            features[c] = pd.to_numeric(features[c], errors='coerce')
-        for c in CATEGORICAL_COLS:
-            features[c] = pd.to_numeric(features[c], errors='coerce')
+        features = input_to_frame(input_data)
+        if timer is not None:
+            timer.mark("build_features")
         
         # Select model based on MODEL_TYPE env variable or availability
-        model = None
-        model_name = ""
-        
-        if MODEL_TYPE.lower() in ["logreg", "logistic", "lr"]:
-            if model_lr is not None:
-                model = model_lr
-                model_name = "logistic_regression"
-            elif model_rf is not None:
-                model = model_rf
-                model_name = "random_forest"
-        else:
-            if model_rf is not None:
-                model = model_rf
-                model_name = "random_forest"
-            elif model_lr is not None:
-                model = model_lr
-                model_name = "logistic_regression"
+        model, model_name = select_model()
         
         if model is None:
             raise HTTPException(
                 status_code=503,
                 detail="No model available. Please ensure model files are loaded."
             )
+        if timer is not None:
+            timer.mark("select_model")
         
         # Debug: Check features type and shape
         print(f"DEBUG: Features type: {type(features)}, shape: {features.shape if hasattr(features, 'shape') else 'N/A'}")
@@ -215,11 +331,17 @@ async def predict(input_data: HeartDiseaseInput):
         # Make prediction - ensure we're working with a fresh DataFrame copy
         features_copy = features.copy()
         print(f"DEBUG: After copy - type: {type(features_copy)}, is DataFrame: {isinstance(features_copy, pd.DataFrame)}")
+        if timer is not None:
+            timer.mark("debug_logging")
         
         # Try prediction
         try:
             prediction = model.predict(features_copy)[0]
+            if timer is not None:
+                timer.mark("predict")
             probability = model.predict_proba(features_copy)[0][1]
+            if timer is not None:
+                timer.mark("predict_proba")
         except Exception as pred_error:
             print(f"DEBUG: Prediction error type: {type(pred_error)}")
             print(f"DEBUG: Prediction error: {str(pred_error)}")
@@ -239,59 +361,202 @@ async def predict(input_data: HeartDiseaseInput):
         print(f"DEBUG Error details:\n{error_details}")
         # Return full error for debugging
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}\n\nTraceback:\n{error_details}")
+    finally:
+        if timer is not None:
+            timer.mark("respond")
+            profiling.end_request(timer)
 
 @app.post("/predict/batch")
 async def predict_batch(inputs: List[HeartDiseaseInput]):
     """
     Batch prediction endpoint
     
-    Accepts multiple inputs and returns predictions for all
+    Accepts multiple inputs and returns predictions for all, scored with the
+    same model as /predict in a single vectorized call
     """
+    # None unless an /admin/profile session is active
+    timer = profiling.begin_request("/predict/batch")
     try:
-        feature_names = ['age','sex','cp','trestbps','chol','fbs','restecg','thalach',
-                        'exang','oldpeak','slope','ca','thal']
-        results = []
-        for input_data in inputs:
-            # Convert input to pandas DataFrame
-            features = pd.DataFrame([[
-                input_data.age,
-                input_data.sex,
-                input_data.cp,
-                input_data.trestbps,
-                input_data.chol,
-                input_data.fbs,
-                input_data.restecg,
-                input_data.thalach,
-                input_data.exang,
-                input_data.oldpeak,
-                input_data.slope,
-                input_data.ca,
-                input_data.thal
-            ]], columns=feature_names)
-            
-            # Select model
-            model = model_lr if model_lr is not None else model_rf
-            model_name = "logistic_regression" if model_lr is not None else "random_forest"
-            
-            if model is None:
-                raise HTTPException(
-                    status_code=503,
-                    detail="No model available"
-                )
-            
-            prediction = model.predict(features)[0]
-            probability = model.predict_proba(features)[0][1]
+        model, model_name = select_model()
+        if model is None:
+            raise HTTPException(
+                status_code=503,
+                detail="No model available"
+            )
+        if timer is not None:
+            timer.mark("select_model")
+        if not inputs:
+            return {"predictions": []}
+        try:
+            features = inputs_to_frame(inputs)
+            if timer is not None:
+                timer.mark("build_features")
+            probabilities = model.predict_proba(features)[:, list(model.classes_).index(1)]
+            if timer is not None:
+                timer.mark("predict_proba")
+            # Same decision as model.predict for a binary classifier (ties go to class 0)
+            predictions = (probabilities > 0.5).astype(int)
+            results = [
+                {
+                    "prediction": int(prediction),
+                    "probability": float(probability),
+                    "model_used": model_name
+                }
+                for prediction, probability in zip(predictions, probabilities)
+            ]
+            return {"predictions": results}
             
-            results.append({
-                "prediction": int(prediction),
-                "probability": float(probability),
-                "model_used": model_name
-            })
-        
-        return {"predictions": results}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+    finally:
+        if timer is not None:
+            timer.mark("respond")
+            profiling.end_request(timer)
+
+@app.post("/predict/anytime", response_model=AnytimePredictionResponse)
+async def predict_anytime(
+    input_data: HeartDiseaseInput,
+    delta: float = Query(0.01, gt=0, lt=1, description="Allowed probability of disagreeing with the full forest"),
+    block_size: int = Query(16, ge=1, le=1000, description="Trees evaluated between early-exit checks"),
+    max_trees: Optional[int] = Query(None, ge=1, description="Hard cap on trees evaluated"),
+    budget_ms: Optional[float] = Query(None, gt=0, description="Stop at the next block after this many ms")
+):
+    """
+    Random Forest prediction with early exit
+
+    Trees vote in blocks until a statistical bound shows the 0.5-threshold
+    decision cannot flip (see anytime_forest.py). The probability is the mean
+    over the trees evaluated.
+    """
+    # None unless an /admin/profile session is active
+    timer = profiling.begin_request("/predict/anytime")
+    try:
+        if model_rf is None:
+            raise HTTPException(status_code=503, detail="Random Forest model not available")
+        if timer is not None:
+            timer.mark("select_model")
+        try:
+            features = input_to_frame(input_data)
+            if timer is not None:
+                timer.mark("build_features")
+            result = anytime_forest.anytime_predict_proba(
+                model_rf, features, delta=delta, block_size=block_size,
+                max_trees=max_trees, budget_ms=budget_ms
+            )
+            if timer is not None:
+                timer.mark("anytime_predict")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Anytime prediction error: {str(e)}")
+        return AnytimePredictionResponse(
+            prediction=int(result['prediction'][0]),
+            probability=float(result['probability'][0]),
+            model_used="random_forest",
+            trees_evaluated=int(result['trees_evaluated'][0]),
+            n_trees=int(result['n_trees']),
+            early_exit=bool(result['early_exit'][0])
+        )
+    finally:
+        if timer is not None:
+            timer.mark("respond")
+            profiling.end_request(timer)
+
+# :path so ids containing "/" (sent percent-encoded) still reach the lookup
+@app.get("/scores/{patient_id:path}", response_model=ScoreResponse)
+async def get_score(patient_id: str):
+    """
+    Precomputed score lookup
+
+    Answers from the memory-mapped score store built by score_store.py
+    (binary search, no model call). Returns 503 while no store matches the
+    current model.
+    """
+    store = score_store_db
+    if store is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Score store not available for the current model. Build it with score_store.py."
+        )
+    result = store.lookup(patient_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No precomputed score for patient {patient_id}")
+    prediction, probability = result
+    return ScoreResponse(
+        patient_id=patient_id,
+        prediction=prediction,
+        probability=probability,
+        model_used=store.model_used,
+        model_version=store.model_version
+    )
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are hidden unless PROFILING_ADMIN_TOKEN is set"""
+    if not profiling.admin_token_configured():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.check_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/admin/profile/sample", dependencies=[Depends(require_admin)])
+async def profile_sample(
+    seconds: float = Query(10.0, gt=0, le=300, description="How long to sample"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Sampling interval"),
+    format: str = Query("json", pattern="^(json|collapsed)$", description="json or collapsed (flamegraph input)")
+):
+    """
+    Run the sampling profiler in this worker for `seconds`
+
+    Returns collapsed stacks plus per-stage timings of the prediction requests
+    served during the window.
+    """
+    if profiling.active is not None:
+        raise HTTPException(status_code=409, detail=f"A {profiling.active.mode} session is already running")
+    session = profiling.SamplingSession(seconds, interval_ms / 1000.0)
+    profiling.active = session
+    session.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        session.stop()
+        if profiling.active is session:
+            profiling.active = None
+    if format == "collapsed":
+        return PlainTextResponse(session.collapsed())
+    return session.result()
+
+@app.post("/admin/profile/requests", dependencies=[Depends(require_admin)])
+async def profile_requests(
+    count: int = Query(10, gt=0, le=10000, description="Number of prediction requests to profile"),
+    top: int = Query(40, gt=0, le=500, description="Functions listed in the cProfile report")
+):
+    """Arm cProfile for the next `count` prediction requests in this worker"""
+    if profiling.active is not None:
+        raise HTTPException(status_code=409, detail=f"A {profiling.active.mode} session is already running")
+    profiling.last_result = None
+    profiling.active = profiling.RequestProfileSession(count, top)
+    return {"pid": os.getpid(), "mode": "cprofile", "status": "armed", "requested": count}
+
+@app.get("/admin/profile/requests", dependencies=[Depends(require_admin)])
+async def profile_requests_result():
+    """cProfile report and per-stage timings for the armed or last finished session"""
+    session = profiling.active
+    if session is not None and session.mode == "cprofile":
+        return session.result()
+    if profiling.last_result is not None:
+        return profiling.last_result
+    raise HTTPException(status_code=404, detail="No cProfile session in this worker")
+
+@app.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_cancel():
+    """Stop the active profiling session in this worker"""
+    session = profiling.active
+    if session is None:
+        return {"pid": os.getpid(), "status": "idle"}
+    profiling.active = None
+    if session.mode == "cprofile":
+        session.disable()
+        profiling.last_result = session.result()
+    else:
+        session.stop()
+    return {"pid": os.getpid(), "status": "cancelled", "mode": session.mode}
 
 if __name__ == "__main__":
     import uvicorn
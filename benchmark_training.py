@@ -0,0 +1,332 @@
+"""
+Training performance benchmark harness
+Times the preprocessing fit, LR fit, RF fit and grid search at configurable
+data sizes and core counts, appends the results to a JSON history and flags
+regressions against the previous run on the same host and core count
+
+The synthetic data for each size is generated once in the parent and pickled;
+every (stage, rows, n_jobs) measurement then runs in a fresh process that loads
+it, and reports the stage's memory as peak RSS growth over that post-load
+baseline, so data generation and imports are not counted.
+
+Usage:
+    python benchmark_training.py --rows 1000 10000 100000 --n-jobs 1 4 -1
+    python benchmark_training.py --stages rf_fit grid_rf --grid notebook --fail-on-regression
+"""
+import sys
+import os
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+import warnings
+import queue as queue_module
+import multiprocessing as mp
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import StratifiedKFold, GridSearchCV, ParameterGrid
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+from joblib.externals.loky import get_reusable_executor
+
+from generate_synthetic_data import (DATA_FILE, NUMERIC_COLS, CATEGORICAL_COLS,
+                                     TARGET_COL, SEED, generate_frame)
+from preprocessing import build_preprocessor
+
+BASE_DIR = Path(".")
+BENCHMARK_DIR = BASE_DIR / "Reports" / "benchmarks"
+HISTORY_FILE = BENCHMARK_DIR / "training_history.json"
+
+STAGES = ['prep_fit', 'lr_fit', 'rf_fit', 'grid_lr', 'grid_rf']
+
+# 'notebook' is the grid from MLOPS_Assignment_1_Group_29.ipynb (section 2.4);
+# 'quick' keeps one value per RF axis so large row counts finish in reasonable time
+GRIDS = {
+    'quick': {
+        'lr': {'clf__C': [0.1, 1.0], 'clf__penalty': ['l1','l2']},
+        'rf': {'clf__n_estimators': [200], 'clf__max_depth': [None, 10]},
+    },
+    'notebook': {
+        'lr': {'clf__C': [0.1, 0.5, 1.0, 2.0, 5.0], 'clf__penalty': ['l1','l2']},
+        'rf': {
+            'clf__n_estimators': [200, 400, 600],
+            'clf__max_depth': [None, 5, 10, 15],
+            'clf__min_samples_split': [2, 5, 10],
+            'clf__min_samples_leaf': [1, 2, 4]
+        },
+    },
+}
+
+
+def build_pipelines(n_jobs):
+    """pipe_lr / pipe_rf as defined in the notebook, with the RF core count configurable"""
+    log_reg = LogisticRegression(solver='liblinear', class_weight='balanced',
+                                 random_state=SEED, max_iter=1000)
+    rf = RandomForestClassifier(n_estimators=200, class_weight='balanced',
+                                random_state=SEED, n_jobs=n_jobs)
+    pipe_lr = Pipeline([('prep', build_preprocessor()), ('clf', log_reg)])
+    pipe_rf = Pipeline([('prep', build_preprocessor()), ('clf', rf)])
+    return pipe_lr, pipe_rf
+
+
+def _run_stage(stage, X, y, n_jobs, grid):
+    """Run one stage; returns (model fits performed, rows seen summed over those fits)"""
+    pipe_lr, pipe_rf = build_pipelines(n_jobs)
+    if stage == 'prep_fit':
+        build_preprocessor().fit(X, y)
+        return 1, len(X)
+    if stage == 'lr_fit':
+        pipe_lr.fit(X, y)
+        return 1, len(X)
+    if stage == 'rf_fit':
+        pipe_rf.fit(X, y)
+        return 1, len(X)
+
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=SEED)
+    family = 'lr' if stage == 'grid_lr' else 'rf'
+    pipe = pipe_lr if family == 'lr' else pipe_rf
+    param_grid = GRIDS[grid][family]
+    search = GridSearchCV(pipe, param_grid, cv=cv, scoring='roc_auc',
+                          n_jobs=n_jobs, return_train_score=True)
+    search.fit(X, y)
+    # Each CV fit trains on the other folds only; the final refit sees every row
+    cv_fits = len(ParameterGrid(param_grid)) * cv.get_n_splits()
+    train_rows = sum(len(train) for train, _ in cv.split(X, y)) // cv.get_n_splits()
+    return cv_fits + 1, cv_fits * train_rows + len(X)
+
+
+def _maxrss_mb(who):
+    if resource is None:
+        return None
+    kb = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(kb / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def write_frame(rows, directory, data_file=DATA_FILE):
+    """Generate the benchmark data for one size and pickle it for the stage processes"""
+    df = generate_frame(rows, seed=SEED, data_file=data_file)
+    path = Path(directory) / f"synthetic_{rows}.pkl"
+    df[NUMERIC_COLS + CATEGORICAL_COLS + [TARGET_COL]].to_pickle(path)
+    return path
+
+
+def _stage_worker(stage, rows, n_jobs, grid, frame_file, queue):
+    """Child-process entry point: load the data, time one stage, report via queue"""
+    warnings.filterwarnings('ignore')
+    try:
+        df = pd.read_pickle(frame_file)
+        X = df[NUMERIC_COLS + CATEGORICAL_COLS]
+        y = df[TARGET_COL]
+        baseline_rss = _maxrss_mb(resource.RUSAGE_SELF) if resource else None
+
+        t0 = os.times()
+        wall0 = time.perf_counter()
+        n_fits, fitted_rows = _run_stage(stage, X, y, n_jobs, grid)
+        # Joining the loky workers makes their CPU time show up in children_*
+        get_reusable_executor().shutdown(wait=True)
+        wall = time.perf_counter() - wall0
+        t1 = os.times()
+
+        cpu = ((t1.user - t0.user) + (t1.system - t0.system)
+               + (t1.children_user - t0.children_user) + (t1.children_system - t0.children_system))
+        peak_rss = _maxrss_mb(resource.RUSAGE_SELF) if resource else None
+        queue.put({
+            'stage': stage,
+            'rows': rows,
+            'n_jobs': n_jobs,
+            'grid': grid if stage.startswith('grid_') else None,
+            'n_fits': n_fits,
+            'fitted_rows': fitted_rows,
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'cpu_utilization': round(cpu / wall, 2) if wall > 0 else None,
+            'baseline_rss_mb': baseline_rss,
+            'peak_rss_mb': peak_rss,
+            # ru_maxrss is a high-water mark, so this is what the stage added on top of the data
+            'stage_rss_mb': round(peak_rss - baseline_rss, 1) if resource else None,
+            'peak_children_rss_mb': _maxrss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            'rows_per_s': round(fitted_rows / wall, 1) if wall > 0 else None,
+        })
+    except Exception as e:
+        queue.put({'stage': stage, 'rows': rows, 'n_jobs': n_jobs, 'error': f"{type(e).__name__}: {e}"})
+
+
+def measure(stage, rows, n_jobs, grid='quick', data_file=DATA_FILE, frame_file=None):
+    """
+    Measure one stage in a fresh spawned process and return its result record
+
+    frame_file is a pickle from write_frame(); without one the data is generated
+    into a temporary file first.
+    """
+    if frame_file is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return measure(stage, rows, n_jobs, grid, data_file, write_frame(rows, tmp, data_file))
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_stage_worker, args=(stage, rows, n_jobs, grid, str(frame_file), queue))
+    proc.start()
+    # The child can die without reporting (OOM kill, spawn/import failure), so never block forever
+    while True:
+        try:
+            result = queue.get(timeout=1.0)
+            break
+        except queue_module.Empty:
+            if not proc.is_alive():
+                try:
+                    result = queue.get(timeout=1.0)
+                except queue_module.Empty:
+                    result = {'stage': stage, 'rows': rows, 'n_jobs': n_jobs,
+                              'error': f"exited with code {proc.exitcode}"}
+                break
+    proc.join()
+    return result
+
+
+def _result_key(machine, result):
+    # n_jobs=-1 means a different core count per node, so only compare like machines
+    return machine + (result['stage'], result['rows'], result['n_jobs'], result.get('grid'))
+
+
+def _machine(run):
+    return (run.get('host'), run.get('cpu_count'))
+
+
+def load_history(history_file=HISTORY_FILE):
+    history_file = Path(history_file)
+    if not history_file.exists():
+        return []
+    with open(history_file) as f:
+        return json.load(f)
+
+
+def find_regressions(results, history, tolerance=0.2, host=None, cpu_count=None):
+    """
+    Compare results with the latest earlier measurement of the same
+    (host, cpu_count, stage, rows, n_jobs, grid); flag wall time or stage RSS
+    (peak over the post-load baseline) growth above tolerance. Runs from other
+    machines are never compared.
+    """
+    machine = (host or socket.gethostname(), cpu_count or os.cpu_count())
+    previous = {}
+    for run in history:
+        for r in run['results']:
+            if 'error' not in r:
+                previous[_result_key(_machine(run), r)] = (run['timestamp'], r)
+
+    regressions = []
+    for r in results:
+        key = _result_key(machine, r)
+        if 'error' in r or key not in previous:
+            continue
+        timestamp, prev = previous[key]
+        for metric in ('wall_s', 'stage_rss_mb'):
+            old, new = prev.get(metric), r.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append({
+                    'stage': r['stage'], 'rows': r['rows'], 'n_jobs': r['n_jobs'], 'grid': r.get('grid'),
+                    'metric': metric, 'previous': old, 'current': new,
+                    'change_pct': round(100 * (new - old) / old, 1),
+                    'baseline_timestamp': timestamp,
+                })
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training stages")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Synthetic data sizes to benchmark")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, -1],
+                        help="Core counts (n_jobs) to benchmark")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run")
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="quick", help="Grid search size")
+    parser.add_argument("--data-file", default=str(DATA_FILE), help="Path to processed.cleveland.data")
+    parser.add_argument("--history", default=str(HISTORY_FILE), help="JSON history file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative slowdown/memory growth flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if any regression is flagged")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Training Performance Benchmark")
+    print("=" * 60)
+    print(f"CPU count: {os.cpu_count()} | grid: {args.grid}")
+    print()
+
+    results = []
+    header = f"{'stage':<10}{'rows':>9}{'n_jobs':>8}{'wall s':>10}{'cpu s':>10}{'+rss MB':>9}{'rows/s':>12}"
+    print(header)
+    print("-" * len(header))
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            frame_file = write_frame(rows, tmp, args.data_file)
+            for n_jobs in args.n_jobs:
+                for stage in args.stages:
+                    r = measure(stage, rows, n_jobs, args.grid, args.data_file, frame_file)
+                    results.append(r)
+                    if 'error' in r:
+                        print(f"{stage:<10}{rows:>9}{n_jobs:>8}  [ERROR] {r['error']}")
+                    else:
+                        print(f"{stage:<10}{rows:>9}{n_jobs:>8}{r['wall_s']:>10.3f}{r['cpu_s']:>10.3f}"
+                              f"{str(r['stage_rss_mb']):>9}{r['rows_per_s']:>12.0f}")
+
+    history_file = Path(args.history)
+    history = load_history(history_file)
+    regressions = find_regressions(results, history, args.tolerance)
+
+    history.append({
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'grid': args.grid,
+        'results': results,
+        'regressions': regressions,
+    })
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(history_file, 'w') as f:
+        json.dump(history, f, indent=2)
+
+    print()
+    if regressions:
+        print(f"[WARN] {len(regressions)} regression(s) vs previous run:")
+        for reg in regressions:
+            print(f"  {reg['stage']} rows={reg['rows']} n_jobs={reg['n_jobs']}: "
+                  f"{reg['metric']} {reg['previous']} -> {reg['current']} (+{reg['change_pct']}%)")
+    else:
+        print("[OK] No regressions vs previous run")
+    print(f"[OK] History written to: {history_file}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
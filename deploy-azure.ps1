@@ -62,6 +62,9 @@ Write-Host "`nStep 6: Creating deployment package..." -ForegroundColor Cyan
 # Note: PowerShell's Compress-Archive doesn't support exclusions well, so we'll include what we need
 $filesToInclude = @(
     "app.py",
+    "profiling.py",
+    "score_store.py",
+    "anytime_forest.py",
     "requirements.txt",
     "startup.py",
     "startup.sh",
@@ -74,6 +77,9 @@ New-Item -ItemType Directory -Path $deployDir | Out-Null
 
 # Copy necessary files
 Copy-Item "app.py" -Destination $deployDir -Force
+Copy-Item "profiling.py" -Destination $deployDir -Force
+Copy-Item "score_store.py" -Destination $deployDir -Force
+Copy-Item "anytime_forest.py" -Destination $deployDir -Force
 Copy-Item "requirements.txt" -Destination $deployDir -Force
 Copy-Item "startup.py" -Destination $deployDir -Force
 if (Test-Path "startup.sh") { Copy-Item "startup.sh" -Destination $deployDir -Force }
@@ -0,0 +1,236 @@
+"""
+Distill the Random Forest into a low-latency serving model
+Fits a compact student on the forest's soft labels over real and synthetic
+inputs, saves it where load_model() finds it and writes a fidelity report
+
+Students:
+- lr:    LogisticRegression on pairwise interactions of the preprocessed features
+- trees: shallow GradientBoostingClassifier (depth 3)
+
+The ROC-AUC change is measured honestly: the saved teacher was refit on all
+Cleveland rows, so a clone of it is refit on the real training split only and a
+student is distilled from that clone the same way; both are then scored on the
+real holdout rows neither has seen.
+
+Soft labels are fitted exactly with the usual weighting trick: every row appears
+once as class 1 with weight p and once as class 0 with weight 1 - p, so the
+weighted log-loss equals the cross-entropy against the teacher's probabilities.
+
+Usage:
+    python distill_model.py
+    python distill_model.py --student trees --synthetic-rows 50000
+    MODEL_TYPE=distilled python app.py
+"""
+import sys
+import io
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import PolynomialFeatures
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import roc_auc_score
+from joblib import load, dump
+
+from generate_synthetic_data import (DATA_FILE, NUMERIC_COLS, CATEGORICAL_COLS, TARGET_COL,
+                                     SEED, load_cleveland, generate_frame)
+from preprocessing import build_preprocessor
+
+BASE_DIR = Path(".")
+MODEL_DIR = BASE_DIR / "models"
+METRICS_DIR = BASE_DIR / "Reports" / "metrics"
+TEACHER_PATHS = [
+    MODEL_DIR / "best_randomforest_pipeline.joblib",
+    MODEL_DIR / "rf_cv_best_pipeline.joblib",
+]
+STUDENT_PATH = MODEL_DIR / "distilled_student_pipeline.joblib"
+REPORT_PATH = METRICS_DIR / "distillation_report.json"
+FEATURE_COLS = NUMERIC_COLS + CATEGORICAL_COLS
+
+
+def build_student(kind):
+    """Unfitted student pipeline; same 'prep' step as the notebook pipelines"""
+    if kind == 'lr':
+        return Pipeline([
+            ('prep', build_preprocessor()),
+            ('interactions', PolynomialFeatures(degree=2, interaction_only=True, include_bias=False)),
+            ('clf', LogisticRegression(solver='liblinear', C=0.5, max_iter=1000, random_state=SEED))
+        ])
+    if kind == 'trees':
+        return Pipeline([
+            ('prep', build_preprocessor()),
+            ('clf', GradientBoostingClassifier(n_estimators=100, max_depth=3, learning_rate=0.1,
+                                               subsample=0.8, random_state=SEED))
+        ])
+    raise ValueError(f"Unknown student '{kind}'. Expected 'lr' or 'trees'")
+
+
+def fit_soft_labels(student, X, soft_labels):
+    """Fit a classifier pipeline on soft targets via duplicated, weighted rows"""
+    X2 = pd.concat([X, X], ignore_index=True)
+    y2 = np.concatenate([np.ones(len(X), dtype=int), np.zeros(len(X), dtype=int)])
+    w2 = np.concatenate([soft_labels, 1 - soft_labels])
+    keep = w2 > 0
+    student.fit(X2[keep], y2[keep], clf__sample_weight=w2[keep])
+    return student
+
+
+def _single_row_latency_ms(model, X, n=200):
+    rows = [X.iloc[[i]] for i in range(min(n, len(X)))]
+    timings = []
+    for row in rows:
+        t0 = time.perf_counter()
+        model.predict_proba(row)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return {'p50': round(float(np.percentile(timings, 50)), 3),
+            'p99': round(float(np.percentile(timings, 99)), 3)}
+
+
+def _batch_rows_per_s(model, X):
+    t0 = time.perf_counter()
+    model.predict_proba(X)
+    return round(len(X) / (time.perf_counter() - t0), 1)
+
+
+def _serialized_bytes(model):
+    buffer = io.BytesIO()
+    dump(model, buffer)
+    return buffer.tell()
+
+
+def holdout_roc_auc(teacher, student_kind, X_real_train, y_real_train, X_synth_train,
+                    X_real_test, y_real_test):
+    """
+    ROC-AUC of teacher and student on real rows the teacher never trained on
+
+    The teacher is cloned and refit on the real training split, and a fresh
+    student is distilled from that refit teacher over the same transfer inputs.
+    """
+    holdout_teacher = clone(teacher).fit(X_real_train, y_real_train)
+    X_transfer = pd.concat([X_real_train, X_synth_train], ignore_index=True)
+    holdout_student = fit_soft_labels(build_student(student_kind), X_transfer,
+                                      holdout_teacher.predict_proba(X_transfer)[:, 1])
+    roc_teacher = float(roc_auc_score(y_real_test, holdout_teacher.predict_proba(X_real_test)[:, 1]))
+    roc_student = float(roc_auc_score(y_real_test, holdout_student.predict_proba(X_real_test)[:, 1]))
+    return {
+        'teacher': roc_teacher,
+        'student': roc_student,
+        'change': roc_student - roc_teacher,
+        'note': 'teacher refit on the real training split; both models out-of-sample',
+    }
+
+
+def fidelity_report(teacher, student, X_real, X_synth):
+    """Agreement, latency and size of the saved student vs the saved teacher"""
+    report = {}
+    # The saved teacher was fit on all real rows, so 'real_rows' agreement is in-sample for it
+    for name, X in (('real_rows', X_real), ('synthetic_holdout', X_synth)):
+        p_teacher = teacher.predict_proba(X)[:, 1]
+        p_student = student.predict_proba(X)[:, 1]
+        report[name] = {
+            'rows': len(X),
+            'agreement': float(np.mean(teacher.predict(X) == student.predict(X))),
+            'mean_abs_probability_diff': float(np.mean(np.abs(p_teacher - p_student))),
+        }
+    report['latency_single_row_ms'] = {
+        'teacher': _single_row_latency_ms(teacher, X_synth),
+        'student': _single_row_latency_ms(student, X_synth),
+    }
+    report['batch_rows_per_s'] = {
+        'teacher': _batch_rows_per_s(teacher, X_synth),
+        'student': _batch_rows_per_s(student, X_synth),
+    }
+    report['size_bytes'] = {
+        'teacher': _serialized_bytes(teacher),
+        'student': _serialized_bytes(student),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the Random Forest into a compact student model")
+    parser.add_argument("--teacher", default=None, help="RF pipeline (default: first of models/*randomforest*/rf_cv*)")
+    parser.add_argument("--student", choices=['lr', 'trees'], default='lr', help="Student model family")
+    parser.add_argument("--synthetic-rows", type=int, default=20000, help="Synthetic rows in the transfer set")
+    parser.add_argument("--data-file", default=str(DATA_FILE), help="Path to processed.cleveland.data")
+    parser.add_argument("--output", default=str(STUDENT_PATH), help="Where to save the student pipeline")
+    parser.add_argument("--report", default=str(REPORT_PATH), help="Where to write the fidelity report")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Random Forest Distillation")
+    print("=" * 60)
+
+    teacher_path = Path(args.teacher) if args.teacher else next((p for p in TEACHER_PATHS if p.exists()), None)
+    if teacher_path is None or not teacher_path.exists():
+        print("[ERROR] No Random Forest pipeline found. Train it in the notebook first.")
+        sys.exit(1)
+    teacher = load(teacher_path)
+    print(f"[OK] Teacher: {teacher_path}")
+
+    # Real rows: part for the transfer set, part held out for the fidelity report
+    real = load_cleveland(args.data_file)
+    X_real = real[FEATURE_COLS]
+    y_real = real[TARGET_COL]
+    X_real_train, X_real_test, y_real_train, y_real_test = train_test_split(
+        X_real, y_real, test_size=0.3, stratify=y_real, random_state=SEED)
+
+    synth = generate_frame(args.synthetic_rows * 2, seed=SEED + 2, data_file=args.data_file)
+    X_synth_train = synth[FEATURE_COLS].iloc[:args.synthetic_rows]
+    X_synth_test = synth[FEATURE_COLS].iloc[args.synthetic_rows:]
+
+    X_transfer = pd.concat([X_real_train, X_synth_train], ignore_index=True)
+    soft_labels = teacher.predict_proba(X_transfer)[:, 1]
+    print(f"[OK] Transfer set: {len(X_real_train)} real + {len(X_synth_train)} synthetic rows")
+
+    print(f"\nTraining '{args.student}' student on soft labels...")
+    t0 = time.perf_counter()
+    student = fit_soft_labels(build_student(args.student), X_transfer, soft_labels)
+    print(f"[OK] Student trained in {time.perf_counter() - t0:.1f}s")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    dump(student, output)
+    print(f"[OK] Student saved to: {output}")
+
+    report = {
+        'teacher_path': str(teacher_path),
+        'student_path': str(output),
+        'student': args.student,
+        'transfer_rows': {'real': len(X_real_train), 'synthetic': len(X_synth_train)},
+    }
+    report.update(fidelity_report(teacher, student, X_real_test, X_synth_test))
+    print("\nRefitting the teacher on the real training split for the holdout ROC-AUC...")
+    report['roc_auc_real_holdout'] = holdout_roc_auc(
+        teacher, args.student, X_real_train, y_real_train, X_synth_train, X_real_test, y_real_test)
+    report_path = Path(args.report)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    roc = report['roc_auc_real_holdout']
+    print("\nFidelity (student vs teacher):")
+    print(f"  Agreement (real rows):         {report['real_rows']['agreement']:.3f}")
+    print(f"  Agreement (synthetic holdout): {report['synthetic_holdout']['agreement']:.3f}")
+    print(f"  ROC-AUC (real holdout, refit): {roc['teacher']:.3f} -> {roc['student']:.3f} ({roc['change']:+.3f})")
+    lat = report['latency_single_row_ms']
+    print(f"  Single-row p50 latency:        {lat['teacher']['p50']:.2f} ms -> {lat['student']['p50']:.2f} ms")
+    size = report['size_bytes']
+    print(f"  Size:                          {size['teacher'] / 1024:.0f} KB -> {size['student'] / 1024:.0f} KB")
+    print(f"\n[OK] Report saved to: {report_path}")
+    print("Serve the student with MODEL_TYPE=distilled")
+
+
+if __name__ == "__main__":
+    main()
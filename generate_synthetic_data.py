@@ -0,0 +1,295 @@
+"""
+Synthetic Cleveland-like data generator for scale testing
+Fits the joint structure of processed.cleveland.data and streams any number of rows
+
+The fit is a class-conditional Gaussian copula:
+- marginals of NUMERIC_COLS and category frequencies of CATEGORICAL_COLS per target class
+- rank correlation between all features within each target class
+- the '?' missingness rate of ca/thal per target class
+
+Usage:
+    python generate_synthetic_data.py --rows 1000000 --format csv --output Data/synthetic/cleveland_1m.csv
+    python generate_synthetic_data.py --rows 5000 --format ndjson > requests.ndjson
+    python generate_synthetic_data.py --rows 303 --format raw --seed 7
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(".")
+DATA_DIR = BASE_DIR / "Data" / "raw"
+DATA_URL = "https://archive.ics.uci.edu/ml/machine-learning-databases/heart-disease/processed.cleveland.data"
+DATA_FILE = DATA_DIR / "processed.cleveland.data"
+
+COLS = [
+    'age','sex','cp','trestbps','chol','fbs','restecg','thalach',
+    'exang','oldpeak','slope','ca','thal','num'
+]
+NUMERIC_COLS = ['age','trestbps','chol','thalach','oldpeak','ca']
+CATEGORICAL_COLS = ['sex','cp','fbs','restecg','exang','slope','thal']
+FEATURE_COLS = COLS[:-1]
+TARGET_COL = 'target'
+MISSING_COLS = ['ca', 'thal']
+SEED = 42
+# Rows are drawn in fixed blocks, each from its own (seed, block index) stream, so a
+# row's values depend only on the seed and its position, never on --rows or --chunk-size
+BLOCK_ROWS = 10_000
+
+FORMATS = ['raw', 'csv', 'ndjson']
+
+# Standard normal CDF tabulated once; np.interp on this grid is far faster than
+# calling NormalDist().cdf per value when streaming millions of rows
+_Z_GRID = np.linspace(-8.5, 8.5, 20001)
+_PHI_GRID = np.array([NormalDist().cdf(z) for z in _Z_GRID])
+
+
+def ensure_dataset(data_file=DATA_FILE):
+    """Download processed.cleveland.data if it is not already on disk"""
+    data_file = Path(data_file)
+    if data_file.exists():
+        return data_file
+    import requests
+    data_file.parent.mkdir(parents=True, exist_ok=True)
+    response = requests.get(DATA_URL)
+    response.raise_for_status()
+    with open(data_file, 'wb') as f:
+        f.write(response.content)
+    return data_file
+
+
+def load_cleveland(data_file=DATA_FILE):
+    """Load the raw Cleveland data exactly as train_quick_model.py does (NaN for '?')"""
+    df = pd.read_csv(ensure_dataset(data_file), header=None, names=COLS, na_values=['?','-9'])
+    for c in COLS:
+        df[c] = pd.to_numeric(df[c], errors='coerce')
+    df[TARGET_COL] = (df['num'] > 0).astype(int)
+    return df
+
+
+def _decimals(values):
+    """Number of decimals needed to reproduce the observed values of a column"""
+    for d in range(4):
+        if np.allclose(values, np.round(values, d)):
+            return d
+    return 4
+
+
+def _normal_scores(values):
+    """Map a column to standard normal scores through its (tie-averaged) ranks"""
+    ranks = pd.Series(values).rank(method='average').to_numpy()
+    u = ranks / (len(values) + 1)
+    return np.array([NormalDist().inv_cdf(p) for p in u])
+
+
+class ClevelandSynthesizer:
+    """Class-conditional Gaussian copula fitted on the Cleveland data"""
+
+    def __init__(self):
+        self.p_positive = None
+        self.num_levels = None
+        self.num_probs = None
+        self.decimals = {}
+        self.impute_values = {}
+        self.classes = {}
+
+    def fit(self, df):
+        """Fit marginals, rank correlations and ca/thal missingness per target class"""
+        self.p_positive = float(df[TARGET_COL].mean())
+
+        positive_num = df.loc[df[TARGET_COL] == 1, 'num'].value_counts(normalize=True).sort_index()
+        self.num_levels = positive_num.index.to_numpy()
+        self.num_probs = positive_num.to_numpy()
+
+        for c in FEATURE_COLS:
+            observed = df[c].dropna().to_numpy(dtype=float)
+            self.decimals[c] = _decimals(observed)
+        # Same statistics as the SimpleImputer steps in the training pipeline
+        for c in NUMERIC_COLS:
+            self.impute_values[c] = float(df[c].median())
+        for c in CATEGORICAL_COLS:
+            self.impute_values[c] = float(df[c].mode().iloc[0])
+
+        for label in (0, 1):
+            part = df[df[TARGET_COL] == label]
+            complete = part.dropna(subset=FEATURE_COLS)
+            scores = np.column_stack([_normal_scores(complete[c].to_numpy(dtype=float))
+                                      for c in FEATURE_COLS])
+            corr = np.corrcoef(scores, rowvar=False)
+            # Constant columns within a class give NaN correlations
+            corr = np.nan_to_num(corr, nan=0.0)
+            np.fill_diagonal(corr, 1.0)
+            # Clip tiny negative eigenvalues so the matrix is a valid covariance
+            eigval, eigvec = np.linalg.eigh(corr)
+            eigval = np.clip(eigval, 1e-6, None)
+            corr = eigvec @ np.diag(eigval) @ eigvec.T
+            d = np.sqrt(np.diag(corr))
+            corr = corr / np.outer(d, d)
+
+            marginals = {}
+            for c in NUMERIC_COLS:
+                marginals[c] = np.sort(part[c].dropna().to_numpy(dtype=float))
+            for c in CATEGORICAL_COLS:
+                freq = part[c].value_counts(normalize=True).sort_index()
+                marginals[c] = (freq.index.to_numpy(dtype=float), np.cumsum(freq.to_numpy()))
+
+            self.classes[label] = {
+                'cholesky': np.linalg.cholesky(corr),
+                'marginals': marginals,
+                'missing': {c: float(part[c].isna().mean()) for c in MISSING_COLS},
+            }
+        return self
+
+    def _sample_class(self, label, n, rng):
+        params = self.classes[label]
+        z = rng.standard_normal((n, len(FEATURE_COLS))) @ params['cholesky'].T
+        u = np.interp(z, _Z_GRID, _PHI_GRID)
+
+        out = {}
+        for j, c in enumerate(FEATURE_COLS):
+            if c in NUMERIC_COLS:
+                sorted_values = params['marginals'][c]
+                positions = u[:, j] * (len(sorted_values) - 1)
+                values = np.interp(positions, np.arange(len(sorted_values)), sorted_values)
+                out[c] = np.round(values, self.decimals[c])
+            else:
+                levels, cum = params['marginals'][c]
+                idx = np.minimum(np.searchsorted(cum, u[:, j], side='right'), len(levels) - 1)
+                out[c] = levels[idx]
+
+        for c in MISSING_COLS:
+            mask = rng.random(n) < params['missing'][c]
+            out[c] = np.where(mask, np.nan, out[c])
+        return pd.DataFrame(out, columns=FEATURE_COLS)
+
+    def sample(self, n, rng):
+        """Draw n rows with FEATURE_COLS, num and target; ca/thal may be NaN"""
+        y = (rng.random(n) < self.p_positive).astype(int)
+        df = pd.DataFrame(index=range(n), columns=FEATURE_COLS, dtype=float)
+        for label in (0, 1):
+            idx = np.flatnonzero(y == label)
+            if len(idx):
+                df.iloc[idx] = self._sample_class(label, len(idx), rng).to_numpy()
+        num = np.zeros(n, dtype=int)
+        n_pos = int(y.sum())
+        if n_pos:
+            num[y == 1] = rng.choice(self.num_levels, size=n_pos, p=self.num_probs).astype(int)
+        df['num'] = num
+        df[TARGET_COL] = y
+        return df
+
+
+def _sample_block(synthesizer, seed, block_index):
+    """All BLOCK_ROWS rows of one block; callers truncate the last block they need"""
+    return synthesizer.sample(BLOCK_ROWS, np.random.default_rng([seed, block_index]))
+
+
+def generate_chunks(n_rows, seed=SEED, chunk_size=100_000, data_file=DATA_FILE, synthesizer=None):
+    """
+    Yield DataFrames of synthetic rows until n_rows have been produced
+
+    Each chunk has patient_id, FEATURE_COLS, num and target; ca/thal keep the
+    Cleveland missingness as NaN. Output is prefix-stable: row i (patient_id
+    P{i:010d}) is the same for a given seed whatever n_rows and chunk_size are,
+    so files of different sizes agree on the patients they share.
+    """
+    if synthesizer is None:
+        synthesizer = ClevelandSynthesizer().fit(load_cleveland(data_file))
+    chunk_size = max(1, int(chunk_size))
+    block_index, block = None, None
+    start = 0
+    while start < n_rows:
+        stop = min(start + chunk_size, n_rows)
+        parts = []
+        pos = start
+        while pos < stop:
+            if block_index != pos // BLOCK_ROWS:
+                block_index = pos // BLOCK_ROWS
+                block = _sample_block(synthesizer, seed, block_index)
+            offset = pos - block_index * BLOCK_ROWS
+            take = min(stop - pos, BLOCK_ROWS - offset)
+            parts.append(block.iloc[offset:offset + take])
+            pos += take
+        chunk = pd.concat(parts, ignore_index=True)
+        chunk.insert(0, 'patient_id', [f"P{i:010d}" for i in range(start, stop)])
+        yield chunk
+        start = stop
+
+
+def generate_frame(n_rows, seed=SEED, data_file=DATA_FILE):
+    """Generate n_rows synthetic rows as a single DataFrame (for in-memory use)"""
+    return pd.concat(list(generate_chunks(n_rows, seed=seed, data_file=data_file)), ignore_index=True)
+
+
+def _format_raw(chunk, decimals):
+    """Rows in processed.cleveland.data layout: 14 comma-separated values, '?' for missing"""
+    columns = []
+    for c in FEATURE_COLS:
+        # The original file writes every feature as a float with at least one decimal
+        fmt = f"{{:.{max(decimals[c], 1)}f}}"
+        columns.append([('?' if np.isnan(v) else fmt.format(v)) for v in chunk[c].to_numpy()])
+    columns.append([str(int(v)) for v in chunk['num'].to_numpy()])
+    return ''.join(','.join(row) + '\n' for row in zip(*columns))
+
+
+def _format_csv(chunk, header):
+    cols = ['patient_id'] + FEATURE_COLS + [TARGET_COL]
+    return chunk[cols].to_csv(index=False, header=header, float_format='%g', lineterminator='\n')
+
+
+def _format_ndjson(chunk, impute_values):
+    """One /predict request body per line (plus patient_id); missing ca/thal are imputed"""
+    body = chunk[FEATURE_COLS].fillna(impute_values)
+    lines = []
+    for pid, row in zip(chunk['patient_id'], body.to_numpy()):
+        record = {'patient_id': pid}
+        for c, v in zip(FEATURE_COLS, row):
+            record[c] = float(v) if c in NUMERIC_COLS else int(v)
+        lines.append(json.dumps(record))
+    return '\n'.join(lines) + '\n'
+
+
+def write_rows(out, n_rows, fmt='csv', seed=SEED, chunk_size=100_000, data_file=DATA_FILE):
+    """Stream n_rows synthetic rows to a text file object in the requested format"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Expected one of {FORMATS}")
+    synthesizer = ClevelandSynthesizer().fit(load_cleveland(data_file))
+    first = True
+    for chunk in generate_chunks(n_rows, seed=seed, chunk_size=chunk_size, synthesizer=synthesizer):
+        if fmt == 'raw':
+            out.write(_format_raw(chunk, synthesizer.decimals))
+        elif fmt == 'csv':
+            out.write(_format_csv(chunk, header=first))
+        else:
+            out.write(_format_ndjson(chunk, synthesizer.impute_values))
+        first = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Cleveland-like heart disease data")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of rows to generate")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="raw (processed.cleveland.data layout), csv, or ndjson (/predict request bodies)")
+    parser.add_argument("--seed", type=int, default=SEED, help="Random seed")
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="Rows formatted and written per chunk (does not change the rows)")
+    parser.add_argument("--data-file", default=str(DATA_FILE), help="Path to processed.cleveland.data")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.output == "-":
+        write_rows(sys.stdout, args.rows, args.format, args.seed, args.chunk_size, args.data_file)
+    else:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', newline='') as f:
+            write_rows(f, args.rows, args.format, args.seed, args.chunk_size, args.data_file)
+        print(f"[OK] Wrote {args.rows} rows ({args.format}) to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Python client for the Heart Disease Prediction API
+
+Sync and asyncio clients over a pooled keep-alive HTTP connection. Single-patient
+calls are grouped into /predict/batch requests, in-flight requests are bounded,
+429/503 responses are retried with backoff and latency statistics are kept.
+
+Example:
+    from heart_disease_client import HeartDiseaseClient
+
+    with HeartDiseaseClient("http://localhost:8000") as client:
+        result = client.predict({"age": 63, "sex": 1, "cp": 3, ...})
+        print(result["probability"], client.stats())
+"""
+from .client import (
+    AsyncHeartDiseaseClient,
+    HeartDiseaseClient,
+    LatencyStats,
+    PredictionError,
+)
+
+__all__ = [
+    "AsyncHeartDiseaseClient",
+    "HeartDiseaseClient",
+    "LatencyStats",
+    "PredictionError",
+]
@@ -0,0 +1,342 @@
+"""
+Client implementation: client-side batching, bounded concurrency, retries and latency stats
+"""
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from urllib.parse import quote
+
+import httpx
+
+RETRY_STATUS = (429, 503)
+# Fields of app.HeartDiseaseInput; all are required by /predict and /predict/batch
+REQUIRED_FIELDS = ('age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
+                   'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal')
+
+
+class PredictionError(Exception):
+    """Raised when the API returns an error or retries are exhausted"""
+
+    def __init__(self, message, status_code=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class LatencyStats:
+    """Rolling latency samples (ms) plus request counters"""
+
+    def __init__(self, window=10000):
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)
+        self._requests = deque(maxlen=window)
+        self.counters = {'calls': 0, 'http_requests': 0, 'batches': 0, 'split_batches': 0,
+                         'retries': 0, 'errors': 0}
+
+    def record_call(self, ms):
+        with self._lock:
+            self._calls.append(ms)
+            self.counters['calls'] += 1
+
+    def record_request(self, ms):
+        with self._lock:
+            self._requests.append(ms)
+            self.counters['http_requests'] += 1
+
+    def incr(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] += n
+
+    @staticmethod
+    def _summarize(samples):
+        if not samples:
+            return {'count': 0}
+        ordered = sorted(samples)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+        return {
+            'count': len(ordered),
+            'mean_ms': round(sum(ordered) / len(ordered), 3),
+            'p50_ms': pct(50),
+            'p90_ms': pct(90),
+            'p99_ms': pct(99),
+            'max_ms': round(ordered[-1], 3),
+        }
+
+    def summary(self):
+        """End-to-end call latency, per-HTTP-request latency and counters"""
+        with self._lock:
+            calls, requests, counters = list(self._calls), list(self._requests), dict(self.counters)
+        return {
+            'call_latency': self._summarize(calls),
+            'http_latency': self._summarize(requests),
+            'counters': counters,
+        }
+
+
+def _as_payload(patient):
+    """
+    Accept plain dicts or pydantic models (e.g. app.HeartDiseaseInput)
+
+    Missing fields are rejected here, before the patient can join a batch,
+    so one incomplete patient fails only its own call.
+    """
+    if hasattr(patient, 'model_dump'):
+        payload = patient.model_dump()
+    elif hasattr(patient, 'dict'):
+        payload = patient.dict()
+    else:
+        payload = dict(patient)
+    missing = [f for f in REQUIRED_FIELDS if payload.get(f) is None]
+    if missing:
+        raise PredictionError(f"Patient is missing required fields: {', '.join(missing)}", body=payload)
+    return payload
+
+
+class AsyncHeartDiseaseClient:
+    """
+    asyncio client
+
+    predict() calls made within linger_ms of each other are sent together as one
+    /predict/batch request of at most max_batch_size patients. At most
+    max_concurrency HTTP requests are in flight; the connection pool has the
+    same size and keeps connections alive between requests.
+    """
+
+    def __init__(self, base_url="http://localhost:8000", max_batch_size=64, linger_ms=5.0,
+                 max_concurrency=8, max_retries=4, backoff_base=0.1, backoff_max=5.0,
+                 timeout=10.0, headers=None):
+        self.base_url = base_url.rstrip('/')
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.linger = max(0.0, linger_ms) / 1000.0
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latency = LatencyStats()
+
+        limits = httpx.Limits(max_connections=max_concurrency,
+                              max_keepalive_connections=max_concurrency)
+        self._http = httpx.AsyncClient(base_url=self.base_url, timeout=timeout,
+                                       limits=limits, headers=headers)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending = []
+        self._linger_handle = None
+        self._tasks = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        """Send anything still queued, wait for in-flight batches and close the pool"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._http.aclose()
+
+    def stats(self):
+        return self.latency.summary()
+
+    async def _request(self, method, url, retry_503=True, **kwargs):
+        """
+        One logical request: bounded concurrency, retry with backoff on 429/503 and connection errors
+
+        With retry_503=False a 503 is only retried when the server sends Retry-After;
+        otherwise it is treated as a lasting condition and raised immediately.
+        """
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    response = await self._http.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    self.latency.record_request((time.perf_counter() - t0) * 1000)
+                    if attempt >= self.max_retries:
+                        self.latency.incr('errors')
+                        raise PredictionError(f"{method} {url} failed: {e}") from e
+                    delay = self._backoff(attempt, None)
+                else:
+                    self.latency.record_request((time.perf_counter() - t0) * 1000)
+                    if response.status_code < 400:
+                        return response.json()
+                    retry_after = response.headers.get('Retry-After')
+                    retryable = response.status_code in RETRY_STATUS and (
+                        retry_503 or response.status_code != 503 or retry_after is not None)
+                    if not retryable or attempt >= self.max_retries:
+                        self.latency.incr('errors')
+                        raise PredictionError(
+                            f"{method} {url} returned {response.status_code}",
+                            status_code=response.status_code, body=response.text
+                        )
+                    delay = self._backoff(attempt, retry_after)
+                attempt += 1
+                self.latency.incr('retries')
+                await asyncio.sleep(delay)
+
+    def _backoff(self, attempt, retry_after):
+        """Exponential backoff with jitter; a numeric Retry-After header wins"""
+        if retry_after is not None:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _flush(self):
+        if self._linger_handle is not None:
+            self._linger_handle.cancel()
+            self._linger_handle = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._send_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch):
+        self.latency.incr('batches')
+        try:
+            body = await self._request('POST', '/predict/batch', json=[payload for payload, _ in batch])
+            results = body['predictions']
+            if len(results) != len(batch):
+                raise PredictionError(f"Expected {len(batch)} predictions, got {len(results)}", body=body)
+        except PredictionError as e:
+            if len(batch) > 1 and e.status_code is not None and e.status_code not in RETRY_STATUS:
+                # A batch-level 4xx/5xx may come from a single patient; retry each one
+                # through /predict so only the callers whose patients fail see an error
+                await self._send_individually(batch)
+                return
+            self._fail(batch, e)
+            return
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _send_individually(self, batch):
+        self.latency.incr('split_batches')
+        outcomes = await asyncio.gather(
+            *(self._request('POST', '/predict', json=payload) for payload, _ in batch),
+            return_exceptions=True
+        )
+        for (_, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def predict(self, patient):
+        """Predict one patient; the call is transparently batched with concurrent calls"""
+        t0 = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((_as_payload(patient), future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._linger_handle is None:
+            self._linger_handle = asyncio.get_running_loop().call_later(self.linger, self._flush)
+        try:
+            return await future
+        finally:
+            self.latency.record_call((time.perf_counter() - t0) * 1000)
+
+    async def predict_many(self, patients):
+        """Predict a list of patients; results are returned in input order"""
+        return await asyncio.gather(*(self.predict(p) for p in patients))
+
+    async def predict_one(self, patient):
+        """Unbatched /predict call (e.g. for latency-critical single requests)"""
+        t0 = time.perf_counter()
+        try:
+            return await self._request('POST', '/predict', json=_as_payload(patient))
+        finally:
+            self.latency.record_call((time.perf_counter() - t0) * 1000)
+
+    async def score(self, patient_id):
+        """
+        Precomputed score from /scores/{patient_id}
+
+        A 503 here means no store matches the current model, which lasts until the
+        store is rebuilt, so it is not retried unless the server sends Retry-After.
+        """
+        t0 = time.perf_counter()
+        try:
+            return await self._request('GET', f'/scores/{quote(str(patient_id), safe="")}', retry_503=False)
+        finally:
+            self.latency.record_call((time.perf_counter() - t0) * 1000)
+
+    async def health(self):
+        return await self._request('GET', '/health')
+
+
+class HeartDiseaseClient:
+    """
+    Thread-safe synchronous client
+
+    Runs an AsyncHeartDiseaseClient on a private event loop thread, so predict()
+    calls from many threads are batched together exactly like async calls.
+    """
+
+    def __init__(self, base_url="http://localhost:8000", **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="heart-disease-client", daemon=True)
+        self._thread.start()
+        self._client = self._call(self._create(base_url, kwargs))
+
+    @staticmethod
+    async def _create(base_url, kwargs):
+        # Created on the client loop so its semaphore and futures belong to it
+        return AsyncHeartDiseaseClient(base_url, **kwargs)
+
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._call(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def stats(self):
+        return self._client.stats()
+
+    def predict(self, patient, timeout=None):
+        return self._call(self._client.predict(patient), timeout)
+
+    def predict_many(self, patients, timeout=None):
+        return self._call(self._client.predict_many(patients), timeout)
+
+    def predict_one(self, patient, timeout=None):
+        return self._call(self._client.predict_one(patient), timeout)
+
+    def score(self, patient_id, timeout=None):
+        return self._call(self._client.score(patient_id), timeout)
+
+    def health(self, timeout=None):
+        return self._call(self._client.health(), timeout)
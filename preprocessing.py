@@ -0,0 +1,29 @@
+"""
+Shared preprocessing for the training scripts
+Same ColumnTransformer as train_quick_model.py and the notebook
+"""
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+
+NUMERIC_COLS = ['age','trestbps','chol','thalach','oldpeak','ca']
+CATEGORICAL_COLS = ['sex','cp','fbs','restecg','exang','slope','thal']
+
+
+def build_preprocessor():
+    """Median-impute + scale numeric columns, mode-impute + one-hot categorical columns"""
+    numeric_pipeline = Pipeline([
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler())
+    ])
+    categorical_pipeline = Pipeline([
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore'))
+    ])
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_pipeline, NUMERIC_COLS),
+            ('cat', categorical_pipeline, CATEGORICAL_COLS)
+        ], remainder='drop'
+    )
@@ -0,0 +1,223 @@
+"""
+On-demand profiling for production workers
+Used by the /admin/profile endpoints in app.py
+
+Two modes, one session at a time per worker process:
+- sampling: a background thread snapshots every thread's stack for N seconds and
+  aggregates them into collapsed stacks (flamegraph.pl / speedscope input)
+- cprofile: cProfile runs around the next N profiled requests
+
+Profiled endpoints are /predict, /predict/batch and /predict/anytime. While no
+session is active each of their requests still pays for the begin_request()
+call (a function call, a global lookup and a None check) and for the
+`timer is not None` branches around each stage; nothing else runs.
+"""
+import os
+import sys
+import io
+import time
+import hmac
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+ADMIN_TOKEN_ENV = "PROFILING_ADMIN_TOKEN"
+MAX_RECORDED_REQUESTS = 1000
+
+# Current session (SamplingSession or RequestProfileSession) or None
+active = None
+# Result of the last finished cProfile session, kept until the next one starts
+last_result = None
+
+
+def admin_token_configured():
+    return bool(os.getenv(ADMIN_TOKEN_ENV))
+
+
+def check_admin_token(token):
+    """Constant-time comparison against PROFILING_ADMIN_TOKEN"""
+    expected = os.getenv(ADMIN_TOKEN_ENV)
+    if not expected or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+class StageTimer:
+    """Per-request stage timings, only created while a session is active"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self._last = self.start
+        self.stages = {}
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = round((now - self._last) * 1000, 3)
+        self._last = now
+
+    def as_dict(self):
+        return {
+            'endpoint': self.endpoint,
+            'total_ms': round((self._last - self.start) * 1000, 3),
+            'stages_ms': self.stages,
+        }
+
+
+def summarize_stages(requests):
+    """
+    Mean and max per stage over the recorded requests, nested per endpoint
+
+    Endpoints are kept apart because their stages share names but not sizes
+    (predict_proba on one row for /predict, on N rows for /predict/batch).
+    """
+    totals = {}
+    for r in requests:
+        stages = totals.setdefault(r['endpoint'], {})
+        for stage, ms in list(r['stages_ms'].items()) + [('total', r['total_ms'])]:
+            stages.setdefault(stage, []).append(ms)
+    return {
+        endpoint: {
+            stage: {'count': len(v), 'mean_ms': round(sum(v) / len(v), 3), 'max_ms': max(v)}
+            for stage, v in stages.items()
+        }
+        for endpoint, stages in totals.items()
+    }
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingSession:
+    """Samples all thread stacks at a fixed interval for a fixed duration"""
+
+    mode = 'sampling'
+
+    def __init__(self, seconds, interval):
+        self.seconds = seconds
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.requests = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + self.seconds
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def record(self, timer):
+        if len(self.requests) < MAX_RECORDED_REQUESTS:
+            self.requests.append(timer.as_dict())
+
+    def collapsed(self):
+        """Brendan Gregg collapsed-stack format: 'frame;frame;frame count' per line"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def result(self):
+        return {
+            'pid': os.getpid(),
+            'mode': self.mode,
+            'seconds': self.seconds,
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'collapsed': self.collapsed(),
+            'requests': self.requests,
+            'stage_summary': summarize_stages(self.requests),
+        }
+
+
+class RequestProfileSession:
+    """Runs cProfile around the next `count` profiled requests"""
+
+    mode = 'cprofile'
+
+    def __init__(self, count, top=40):
+        self.count = count
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.requests = []
+
+    @property
+    def done(self):
+        return len(self.requests) >= self.count
+
+    def enable(self):
+        self.profile.enable()
+
+    def disable(self):
+        self.profile.disable()
+
+    def record(self, timer):
+        self.requests.append(timer.as_dict())
+
+    def stats_text(self):
+        if not self.requests:
+            return ""
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(self.top)
+        return out.getvalue()
+
+    def result(self):
+        return {
+            'pid': os.getpid(),
+            'mode': self.mode,
+            'status': 'complete' if self.done else 'collecting',
+            'requested': self.count,
+            'profiled': len(self.requests),
+            'stats': self.stats_text(),
+            'requests': self.requests,
+            'stage_summary': summarize_stages(self.requests),
+        }
+
+
+def begin_request(endpoint):
+    """Called at the top of a profiled endpoint; returns a StageTimer or None"""
+    session = active
+    if session is None:
+        return None
+    if session.mode == 'cprofile':
+        session.enable()
+    return StageTimer(endpoint)
+
+
+def end_request(timer):
+    """Called when a profiled endpoint finishes (success or error)"""
+    global active, last_result
+    session = active
+    if session is None:
+        return
+    if session.mode == 'cprofile':
+        session.disable()
+        if session.done:
+            return
+        session.record(timer)
+        if session.done:
+            last_result = session.result()
+            active = None
+    else:
+        session.record(timer)
@@ -0,0 +1,286 @@
+"""
+Precomputed score store
+Scores a population file against the current model and writes a compact
+memory-mapped store that /scores/{patient_id} answers from without a model call
+
+File layout:
+    8 bytes   magic b"HDSCORE1"
+    4 bytes   little-endian header length
+    N bytes   JSON header (model_version, model_used, count, id_width, ...)
+    padding   to a 64-byte boundary
+    records   fixed-width (id, probability, prediction), sorted by id
+
+Lookups binary-search the id column of the memory map, so they touch
+O(log n) pages and never load the whole file.
+
+Usage:
+    python score_store.py --population population.csv
+    python score_store.py --population population.ndjson --output models/scores.bin
+"""
+import os
+import sys
+import json
+import struct
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STORE_MAGIC = b"HDSCORE1"
+STORE_ALIGN = 64
+# Under models/ so it ships with the Docker image and the deployment zip (Data/ is excluded)
+DEFAULT_STORE_PATH = Path("models") / "scores.bin"
+BUILD_LOCK_STALE_SECONDS = 3600
+ID_COL = 'patient_id'
+
+NUMERIC_COLS = ['age','trestbps','chol','thalach','oldpeak','ca']
+CATEGORICAL_COLS = ['sex','cp','fbs','restecg','exang','slope','thal']
+
+
+def model_version(model_path):
+    """Content hash of a model file; changes whenever the model file changes"""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _record_dtype(id_width):
+    return np.dtype([('id', f'S{id_width}'), ('probability', '<f4'), ('prediction', 'u1')])
+
+
+def _read_population(population_file, chunk_size):
+    """Yield DataFrame chunks from a CSV or NDJSON population file (needs patient_id)"""
+    population_file = Path(population_file)
+    if population_file.suffix.lower() in ('.ndjson', '.jsonl', '.json'):
+        reader = pd.read_json(population_file, lines=True, chunksize=chunk_size,
+                              dtype={ID_COL: str})
+    else:
+        reader = pd.read_csv(population_file, chunksize=chunk_size, dtype={ID_COL: str},
+                             na_values=['?'])
+    for chunk in reader:
+        if ID_COL not in chunk.columns:
+            raise ValueError(f"Population file must have a '{ID_COL}' column")
+        yield chunk
+
+
+def build_store(model, model_used, version, population_file, output=DEFAULT_STORE_PATH,
+                chunk_size=100_000):
+    """Score every row of population_file and atomically write the store to output"""
+    ids, probabilities, predictions = [], [], []
+    for chunk in _read_population(population_file, chunk_size):
+        # Same column order and dtypes as /predict
+        features = chunk[NUMERIC_COLS + CATEGORICAL_COLS].apply(pd.to_numeric, errors='coerce')
+        probabilities.append(model.predict_proba(features)[:, 1].astype('<f4'))
+        predictions.append(model.predict(features).astype('u1'))
+        ids.append(chunk[ID_COL].astype(str).to_numpy())
+
+    ids = np.concatenate(ids) if ids else np.array([], dtype=str)
+    encoded = np.char.encode(ids.astype(str), 'utf-8')
+    id_width = max(int(encoded.dtype.itemsize), 1)
+
+    records = np.empty(len(encoded), dtype=_record_dtype(id_width))
+    records['id'] = encoded
+    records['probability'] = np.concatenate(probabilities) if probabilities else []
+    records['prediction'] = np.concatenate(predictions) if predictions else []
+    records = records[np.argsort(records['id'], kind='stable')]
+    if len(records) > 1:
+        duplicates = records['id'][1:] == records['id'][:-1]
+        if duplicates.any():
+            dup = records['id'][1:][duplicates][0].decode()
+            raise ValueError(f"Duplicate {ID_COL} in population file: {dup}")
+
+    header = json.dumps({
+        'model_version': version,
+        'model_used': model_used,
+        'count': int(len(records)),
+        'id_width': id_width,
+        'population_file': str(population_file),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    }).encode()
+    prefix = STORE_MAGIC + struct.pack('<I', len(header)) + header
+    padding = b"\0" * (-len(prefix) % STORE_ALIGN)
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + f".tmp{os.getpid()}")
+    with open(tmp, 'wb') as f:
+        f.write(prefix + padding)
+        f.write(records.tobytes())
+    # Readers holding the old memory map keep their file; new opens see the new one
+    os.replace(tmp, output)
+    return output
+
+
+class ScoreStore:
+    """Read-only memory-mapped view of a store written by build_store()"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            magic = f.read(len(STORE_MAGIC))
+            if magic != STORE_MAGIC:
+                raise ValueError(f"{self.path} is not a score store")
+            (header_len,) = struct.unpack('<I', f.read(4))
+            self.header = json.loads(f.read(header_len))
+        offset = len(STORE_MAGIC) + 4 + header_len
+        offset += -offset % STORE_ALIGN
+
+        self.model_version = self.header['model_version']
+        self.model_used = self.header['model_used']
+        self.count = self.header['count']
+        self.id_width = self.header['id_width']
+        if self.count:
+            self.records = np.memmap(self.path, dtype=_record_dtype(self.id_width), mode='r',
+                                     offset=offset, shape=(self.count,))
+        else:
+            self.records = np.empty(0, dtype=_record_dtype(self.id_width))
+        self._ids = self.records['id']
+
+    def lookup(self, patient_id):
+        """Binary search for patient_id; returns (prediction, probability) or None"""
+        key = patient_id.encode('utf-8')
+        if len(key) > self.id_width or not key:
+            return None
+        i = int(np.searchsorted(self._ids, key))
+        if i < self.count and self._ids[i] == key:
+            record = self.records[i]
+            return int(record['prediction']), float(record['probability'])
+        return None
+
+
+def open_store(path=DEFAULT_STORE_PATH, expected_version=None):
+    """
+    Open the store at path, or return None if it is missing, unreadable or was
+    built for a model other than expected_version
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        store = ScoreStore(path)
+    except Exception as e:
+        print(f"Error opening score store {path}: {e}")
+        return None
+    if expected_version is not None and store.model_version != expected_version:
+        print(f"Score store {path} was built for model {store.model_version}, "
+              f"current model is {expected_version}; ignoring it")
+        return None
+    return store
+
+
+def _lock_path(path):
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+def _pid_alive(pid):
+    """False only when pid certainly no longer exists"""
+    if sys.platform == 'win32':
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows; fall back to the age check
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lock_is_stale(lock, stale_after=BUILD_LOCK_STALE_SECONDS):
+    """
+    A lock is stale when the pid written into it is gone (worker killed
+    mid-build) or, failing that, when it is older than stale_after seconds
+    """
+    try:
+        age = time.time() - lock.stat().st_mtime
+        owner = lock.read_text().strip()
+    except FileNotFoundError:
+        return False
+    # An empty lock has just been created and its owner has not written its pid yet
+    if owner.isdigit() and not _pid_alive(int(owner)):
+        return True
+    return age >= stale_after
+
+
+def acquire_build_lock(path=DEFAULT_STORE_PATH, stale_after=BUILD_LOCK_STALE_SECONDS):
+    """
+    Try to become the single process rebuilding the store at path
+
+    Uses an exclusively created lock file next to the store, so with several
+    gunicorn workers only one re-scores the population. A stale lock (its
+    builder's pid is gone, or it is older than stale_after seconds) is taken over.
+    """
+    lock = _lock_path(path)
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not _lock_is_stale(lock, stale_after):
+                return False
+            try:
+                lock.unlink()
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def release_build_lock(path=DEFAULT_STORE_PATH):
+    try:
+        _lock_path(path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def build_lock_held(path=DEFAULT_STORE_PATH, stale_after=BUILD_LOCK_STALE_SECONDS):
+    """True while a live builder holds the lock for the store at path"""
+    lock = _lock_path(path)
+    return lock.exists() and not _lock_is_stale(lock, stale_after)
+
+
+def wait_for_store(path=DEFAULT_STORE_PATH, expected_version=None, poll=2.0,
+                   timeout=BUILD_LOCK_STALE_SECONDS):
+    """
+    Wait for another process's rebuild to finish, then open its result
+
+    Returns None if the store still does not match expected_version, e.g.
+    because the builder died and left a stale lock behind.
+    """
+    deadline = time.time() + timeout
+    while build_lock_held(path, timeout) and time.time() < deadline:
+        time.sleep(poll)
+    return open_store(path, expected_version)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-score a population file into a score store")
+    parser.add_argument("--population", required=True, help="CSV or NDJSON file with patient_id and features")
+    parser.add_argument("--output", default=str(DEFAULT_STORE_PATH), help="Store file to write")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows scored per batch")
+    args = parser.parse_args()
+
+    # Use the same model the API serves (MODEL_TYPE, models/ search paths)
+    import app
+    app.load_model()
+    model, model_used = app.select_model()
+    version = app.current_model_version()
+
+    print(f"Scoring {args.population} with {model_used} (model version {version})...")
+    output = build_store(model, model_used, version, args.population, args.output, args.chunk_size)
+    store = ScoreStore(output)
+    print(f"[OK] Wrote {store.count} scores to {output} ({output.stat().st_size / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
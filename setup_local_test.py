@@ -49,7 +49,8 @@ def check_model_files():
         "best_logreg_pipeline.joblib",
         "logreg_cv_best_pipeline.joblib",
         "best_randomforest_pipeline.joblib",
-        "rf_cv_best_pipeline.joblib"
+        "rf_cv_best_pipeline.joblib",
+        "distilled_student_pipeline.joblib"
     ]
     
     if not models_dir.exists():
@@ -2,8 +2,10 @@
 Test script for the Heart Disease Prediction API
 Run this locally before deploying to Azure
 """
+import os
 import requests
 import json
+from urllib.parse import quote
 
 # Local testing
 BASE_URL = "http://localhost:8000"
@@ -11,6 +13,22 @@ BASE_URL = "http://localhost:8000"
 # Azure deployment URL (update after deployment)
 # BASE_URL = "https://mlops-group29-heart-disease-api.azurewebsites.net"
 
+SAMPLE_DATA = {
+    "age": 63,
+    "sex": 1,
+    "cp": 3,
+    "trestbps": 145,
+    "chol": 233,
+    "fbs": 1,
+    "restecg": 0,
+    "thalach": 150,
+    "exang": 0,
+    "oldpeak": 2.3,
+    "slope": 0,
+    "ca": 0,
+    "thal": 1
+}
+
 def test_health():
     """Test health endpoint"""
     print("Testing /health endpoint...")
@@ -111,6 +129,119 @@ def test_batch_predict():
         print(f"Error: {response.text}")
     print()
 
+def test_batch_matches_predict():
+    """Test that /predict/batch serves the same model and scores as /predict"""
+    print("Testing /predict/batch against /predict...")
+    second = dict(SAMPLE_DATA, age=37, cp=2, trestbps=130, chol=250, thalach=187, oldpeak=3.5, thal=2)
+    batch = requests.post(f"{BASE_URL}/predict/batch", json=[SAMPLE_DATA, second])
+    print(f"Status: {batch.status_code}")
+    assert batch.status_code == 200, batch.text
+    for item, body in zip(batch.json()["predictions"], [SAMPLE_DATA, second]):
+        single = requests.post(f"{BASE_URL}/predict", json=body).json()
+        print(f"batch: {item} | predict: {single}")
+        assert item["model_used"] == single["model_used"], "batch used a different model"
+        assert item["prediction"] == single["prediction"]
+        assert abs(item["probability"] - single["probability"]) < 1e-9
+    print()
+
+def test_predict_anytime():
+    """Test early-exit Random Forest endpoint"""
+    print("Testing /predict/anytime endpoint...")
+    response = requests.post(f"{BASE_URL}/predict/anytime", json=SAMPLE_DATA, params={"delta": 0.01})
+    print(f"Status: {response.status_code}")
+    if response.status_code == 503:
+        print("Random Forest model not loaded; skipping")
+        print()
+        return
+    assert response.status_code == 200, response.text
+    result = response.json()
+    print(f"Response: {json.dumps(result, indent=2)}")
+    assert result["model_used"] == "random_forest"
+    assert 1 <= result["trees_evaluated"] <= result["n_trees"]
+    # An early exit always stops before the last tree
+    assert not result["early_exit"] or result["trees_evaluated"] < result["n_trees"]
+    assert result["prediction"] == int(result["probability"] > 0.5)
+
+    # Capping the trees must be honoured
+    capped = requests.post(f"{BASE_URL}/predict/anytime", json=SAMPLE_DATA, params={"max_trees": 8, "block_size": 4})
+    assert capped.status_code == 200, capped.text
+    print(f"max_trees=8: trees_evaluated={capped.json()['trees_evaluated']}")
+    assert capped.json()["trees_evaluated"] <= 8
+    print()
+
+def test_scores():
+    """Test precomputed score lookup (404 for unknown patients, 503 without a store)"""
+    print("Testing /scores/{patient_id} endpoint...")
+    unknown = "no such/patient?#1"
+    response = requests.get(f"{BASE_URL}/scores/{quote(unknown, safe='')}")
+    print(f"Unknown patient status: {response.status_code}")
+    if response.status_code == 503:
+        print(f"No score store for the current model: {response.json()['detail']}")
+        print()
+        return
+    assert response.status_code == 404, response.text
+    assert unknown in response.json()["detail"], response.text
+
+    # Generated populations (generate_synthetic_data.py) start at P0000000000
+    patient_id = os.getenv("SCORE_TEST_PATIENT_ID", "P0000000000")
+    response = requests.get(f"{BASE_URL}/scores/{quote(patient_id, safe='')}")
+    print(f"Patient {patient_id} status: {response.status_code}")
+    if response.status_code == 200:
+        result = response.json()
+        print(f"Response: {json.dumps(result, indent=2)}")
+        assert result["patient_id"] == patient_id
+        assert result["prediction"] in (0, 1)
+        assert 0.0 <= result["probability"] <= 1.0
+        assert result["model_version"].startswith(result["model_used"])
+    else:
+        print(f"Patient {patient_id} is not in the store; set SCORE_TEST_PATIENT_ID to check a lookup")
+    print()
+
+def test_admin_profile():
+    """Test on-demand profiling endpoints (needs PROFILING_ADMIN_TOKEN set for client and server)"""
+    print("Testing /admin/profile endpoints...")
+    token = os.getenv("PROFILING_ADMIN_TOKEN")
+    response = requests.post(f"{BASE_URL}/admin/profile/requests", params={"count": 3},
+                             headers={"X-Admin-Token": token or "not-the-token"})
+    print(f"Status: {response.status_code}")
+    if not token:
+        # Disabled on the server (404) or rejected (403); either way nothing was armed
+        assert response.status_code in (403, 404), response.text
+        print("PROFILING_ADMIN_TOKEN not set; skipping profiling checks")
+        print()
+        return
+    if response.status_code == 409:
+        requests.delete(f"{BASE_URL}/admin/profile", headers={"X-Admin-Token": token})
+        response = requests.post(f"{BASE_URL}/admin/profile/requests", params={"count": 3},
+                                 headers={"X-Admin-Token": token})
+    assert response.status_code == 200, response.text
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+
+    wrong = requests.get(f"{BASE_URL}/admin/profile/requests", headers={"X-Admin-Token": token + "x"})
+    assert wrong.status_code == 403, wrong.text
+
+    # Sessions are per worker; with a single worker these three requests are the profiled ones
+    requests.post(f"{BASE_URL}/predict", json=SAMPLE_DATA)
+    requests.post(f"{BASE_URL}/predict/batch", json=[SAMPLE_DATA, SAMPLE_DATA])
+    requests.post(f"{BASE_URL}/predict/anytime", json=SAMPLE_DATA)
+
+    report = requests.get(f"{BASE_URL}/admin/profile/requests", headers={"X-Admin-Token": token})
+    assert report.status_code == 200, report.text
+    result = report.json()
+    print(f"Session status: {result['status']}, profiled: {result['profiled']}/{result['requested']}")
+    for endpoint, stages in result["stage_summary"].items():
+        timings = ', '.join(f"{stage}={summary['mean_ms']}ms" for stage, summary in stages.items())
+        print(f"  {endpoint}: {timings}")
+        assert "total" in stages
+    assert result["stats"], "cProfile report is empty"
+
+    sample = requests.post(f"{BASE_URL}/admin/profile/sample", params={"seconds": 1, "format": "collapsed"},
+                           headers={"X-Admin-Token": token})
+    assert sample.status_code == 200, sample.text
+    print(f"Sampling profile: {len(sample.text.splitlines())} collapsed stacks")
+    requests.delete(f"{BASE_URL}/admin/profile", headers={"X-Admin-Token": token})
+    print()
+
 if __name__ == "__main__":
     print("=" * 50)
     print("Heart Disease Prediction API - Test Suite")
@@ -122,6 +253,10 @@ if __name__ == "__main__":
         test_root()
         test_predict()
         test_batch_predict()
+        test_batch_matches_predict()
+        test_predict_anytime()
+        test_scores()
+        test_admin_profile()
         print("All tests completed!")
     except requests.exceptions.ConnectionError:
         print("Error: Could not connect to the API.")